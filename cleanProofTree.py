@@ -1,39 +1,84 @@
 import xml.etree.ElementTree as ET
-import sys
+import os
 
-def clean_proof_tree(tree):
-    root = tree.getroot()
+DOCTYPE = b"<!DOCTYPE why3session PUBLIC \"-//Why3//proof session v5//EN\"\n\"https://www.why3.org/why3session.dtd\">"
 
-    # Iterate over all "goal" elements
-    for goal in root.findall(".//goal"):
-        transf_child = None
-        proof_child = None
+def clean_goal(goal):
+    transf_child = None
+    proof_child = None
 
-        for child in goal:
-            if child.tag == "transf":
-                transf_child = child
-                break  # Stop when the first "transf" is found
-            elif child.tag == "proof" and proof_child is not None:
-                proof_child = child
+    for child in goal:
+        if child.tag == "transf":
+            transf_child = child
+            break  # Stop when the first "transf" is found
+        elif child.tag == "proof" and proof_child is None:
+            proof_child = child
 
-        child_to_keep = transf_child if transf_child is not None else proof_child
+    child_to_keep = transf_child if transf_child is not None else proof_child
 
-        # Remove all other children of the "goal" element that are "proof" or "transf"
-        if child_to_keep is not None:
-            for child in list(goal):
-                if child != child_to_keep and child.tag in {"proof", "transf"}:
-                    goal.remove(child)
+    # Remove all other children of the "goal" element that are "proof" or "transf"
+    if child_to_keep is not None:
+        goal[:] = [child for child in goal if child is child_to_keep or child.tag not in ("proof", "transf")]
 
-    return root
+def start_tag(root):
+    # Serialize an empty copy of the root and cut off its closing tag
+    shell = ET.Element(root.tag, root.attrib)
+    shell.text = root.text
+    res = ET.tostring(shell, encoding='utf-8', short_empty_elements=False)
+    return res[:res.rindex(b"</")]
 
-def add_doctype(root):
-    res = ET.tostring(root, xml_declaration=True, encoding='utf-8').split(b"\n")
-    res.insert(1, b"<!DOCTYPE why3session PUBLIC \"-//Why3//proof session v5//EN\"\n\"https://www.why3.org/why3session.dtd\">")
-    return b"\n".join(res)
+def clean_proof_tree(source, out):
+    out.write(b"<?xml version='1.0' encoding='utf-8'?>\n" + DOCTYPE + b"\n")
 
-clean = clean_proof_tree(ET.parse("src/why3session.xml"))
+    root = None
+    root_written = False
+    depth = 0
+    # Top-level children seen so far, and how many of them were already written
+    started = 0
+    written = 0
 
-complete = add_doctype(clean)
+    # Top-level children are written out and dropped as soon as they are complete,
+    # so only the subtree currently being parsed is kept in memory
+    def flush(done):
+        nonlocal root_written, written
+        if not root_written:
+            out.write(start_tag(root))
+            root_written = True
+        for child in root[:done]:
+            # Serialize straight into the output instead of building the bytes first
+            ET.ElementTree(child).write(out, encoding='utf-8', xml_declaration=False)
+        del root[:done]
+        written += done
 
-with open("src/why3session.xml", 'wb') as f:
-    f.write(complete)
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            depth += 1
+            if root is None:
+                root = elem
+            elif depth == 2:
+                # The parser runs ahead of the events, so root may already hold later
+                # siblings; the previous ones (and their tails) are complete by now
+                flush(started - written)
+                started += 1
+            continue
+
+        depth -= 1
+        # Goals nested in transformations close first, so every goal is visited once
+        if elem.tag == "goal":
+            clean_goal(elem)
+
+    flush(len(root))
+    out.write(b"</" + root.tag.encode('utf-8') + b">")
+
+with open("src/why3session.xml", 'rb') as source:
+    # The temporary file is only guarded once it exists
+    out = open("src/why3session.xml.tmp", 'wb')
+    try:
+        with out:
+            clean_proof_tree(source, out)
+    except BaseException:
+        # Do not leave a partial session next to the sources
+        os.remove("src/why3session.xml.tmp")
+        raise
+
+os.replace("src/why3session.xml.tmp", "src/why3session.xml")
@@ -1,48 +1,53 @@
-import xml.etree.ElementTree as ET
+try:
+    from lxml import etree as ET
+except ImportError:  # stdlib fallback when lxml is not installed
+    import xml.etree.ElementTree as ET
+import numpy as np
 import matplotlib.pyplot as plt
 from collections import defaultdict
 
-# Function to recursively find all 'proof' elements
-def find_proof_elements(root):
-    return root.findall(".//proof")  # .//proof finds all 'proof' elements no matter how deeply nested
-
-# Function to parse XML and extract prover and steps
-def parse_prover_steps(xml_content):
-    root = ET.fromstring(xml_content)  # Parse XML from string
-
+# Function to parse XML and extract prover and steps in a single pass
+def parse_prover_steps(source):
     prover_steps = defaultdict(list)
+    stack = []  # Currently open elements, so that a 'result' can see its enclosing 'proof'
 
-    # Find all 'proof' elements no matter where they are nested
-    proofs = find_proof_elements(root)
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            stack.append(elem)
+            continue
 
-    for proof in proofs:
-        prover = proof.get('prover')
-        result = proof.find('result')
-        if result is not None:
-            steps = int(result.get('steps', 0))
-            prover_steps[prover].append(steps)
-    
-    return prover_steps
+        stack.pop()
+        if elem.tag == 'result' and stack and stack[-1].tag == 'proof':
+            steps = int(elem.get('steps', 0))
+            prover_steps[stack[-1].get('prover')].append(steps)
+        elif elem.tag == 'proof':
+            elem.clear()  # The proof has been read, free its subtree
 
-# Function to plot histograms
+    return {prover: np.array(steps, dtype=np.int32) for prover, steps in prover_steps.items()}
+
+# Function to plot histograms, saved as hist_<prover>.png
 def plot_histograms(prover_steps):
+    fig, ax = plt.subplots()  # A single figure is reused for all provers
+
     for prover, steps in prover_steps.items():
-        plt.figure()
-        plt.hist(steps, bins=50, alpha=0.7, color='blue')
-        plt.yscale('log')
-        plt.title(f'Histogram of Steps for Prover {prover}')
-        plt.xlabel('Steps')
-        plt.ylabel('Frequency')
-        plt.grid(True)
-        plt.show()
+        # Bin the steps array with numpy and draw the bars from the counts
+        counts, edges = np.histogram(steps, bins=50)
+        ax.cla()
+        ax.bar(edges[:-1], counts, width=np.diff(edges), align='edge', alpha=0.7, color='blue')
+        ax.set_yscale('log')
+        ax.set(title=f'Histogram of Steps for Prover {prover}', xlabel='Steps', ylabel='Frequency')
+        ax.grid(True)
+        file_name = f'hist_{prover}.png'
+        fig.savefig(file_name)
+        print(f"Saved histogram of prover {prover} to {file_name}")
+
+    plt.close(fig)
 
 # Main function to load file and generate histograms
 def main():
     file_path = 'bitcoin/why3session.xml'  # File path to read the XML content
-    with open(file_path, 'r') as file:
-        xml_content = file.read()
 
-    prover_steps = parse_prover_steps(xml_content)
+    prover_steps = parse_prover_steps(file_path)
     plot_histograms(prover_steps)
 
 if __name__ == "__main__":
@@ -1,44 +1,42 @@
-from xml.etree.ElementTree import parse as parse_xml
-from os import listdir
+try:
+    from lxml.etree import parse as parse_xml
+except ImportError:  # stdlib fallback for the docker image
+    from xml.etree.ElementTree import parse as parse_xml
+from os import scandir
 from sys import exit
 
+# twoHonestParties.mlw is run for the simple payment test, it thus does not need a proof. We therefore ignore it.
+IGNORED_FILENAMES = frozenset({'twoHonestParties.mlw'})
+
 def extract_mlw_filenames_from_session():
     root = parse_xml('src/why3session.xml').getroot()
-    mlw_filenames = set()
-
-    for elem in root.iter():
-        if elem.tag == 'path': # 'path' is used by why3 for filenames
-            if elem.attrib['name'].endswith('.mlw'):
-                mlw_filenames.add(elem.attrib['name'])
 
-    return mlw_filenames
+    # 'path' is used by why3 for filenames
+    names = (elem.get('name', '') for elem in root.iter('path'))
+    return frozenset(name for name in names if name.endswith('.mlw'))
 
 def extract_mlw_filenames_from_directory():
-    mlw_filenames = set()
-
-    for file_name in listdir('src/'):
-        if file_name.endswith('.mlw'):
-            mlw_filenames.add(file_name)
-
-    return mlw_filenames
+    with scandir('src/') as entries:
+        return frozenset(entry.name for entry in entries if entry.name.endswith('.mlw'))
 
 def check_whyml_files_proven():
     session_filenames = extract_mlw_filenames_from_session()
     directory_filenames = extract_mlw_filenames_from_directory()
-    # twoHonestParties.mlw is run for the simple payment test, it thus does not need a proof. We therefore ignore it.
-    relevant_directory_filenames = directory_filenames - {'twoHonestParties.mlw'}
+    relevant_directory_filenames = directory_filenames - IGNORED_FILENAMES
+
+    mismatched = session_filenames ^ relevant_directory_filenames
 
-    if session_filenames == relevant_directory_filenames:
+    if not mismatched:
         print("Proof availability check PASSED:")
         print("Apart from twoHonestParties.mlw, all *.mlw files in the directory have a proof in the proof tree and vice versa.")
     else:
         print("Proof availability check FAILED:")
-        extra_in_session = session_filenames - relevant_directory_filenames
+        extra_in_session = mismatched & session_filenames
         if extra_in_session:
             print("*.mlw files in proof tree but not in directory:")
             for file in extra_in_session:
                 print(file)
-        extra_in_directory = relevant_directory_filenames - session_filenames
+        extra_in_directory = mismatched - extra_in_session
         if extra_in_directory:
             print("*.mlw files in directory but not in proof tree:")
             for file in extra_in_directory:
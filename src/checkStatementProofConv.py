@@ -1,61 +1,70 @@
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from sys import exit
 
+# Matches either a module declaration (capturing its name) or a 'val lemma'/'axiom' declaration
+DECLARATION_PATTERN = re.compile(r'^module[ \t]+(\w+)|\b(?:val lemma|axiom)\b', re.MULTILINE)
+LEMMAS_PATTERN = re.compile(r'module\s+(\w+Lemmas)\b')
+PROOFS_PATTERN = re.compile(r'module\s+(\w+Proofs)\s*:\s*(\w+Lemmas)')
+# Comment delimiters, '(*)' is the multiplication operator and not a comment
+COMMENT_DELIMITER_PATTERN = re.compile(r'\(\*\)|\(\*|\*\)')
+
 def remove_comments(content):
     """
-    Removes all block comments (from (* to *)) from the content.
+    Removes all block comments (from (* to *)) from the content, including nested ones.
     """
-    comment_pattern = re.compile(r'\(\*.*?\*\)', re.DOTALL)
-    return re.sub(comment_pattern, '', content)
-
-def check_lemma_axiom_in_lemmas(file_path):
+    parts = []
+    depth = 0
+    start = 0  # Start of the code following the last comment
+
+    for match in COMMENT_DELIMITER_PATTERN.finditer(content):
+        delimiter = match.group()
+        if delimiter == '(*':
+            if depth == 0:
+                parts.append(content[start:match.start()])
+            depth += 1
+        elif delimiter == '*)' and depth > 0:
+            depth -= 1
+            if depth == 0:
+                start = match.end()
+
+    # An unterminated comment drops the rest of the content
+    if depth == 0:
+        parts.append(content[start:])
+    return ''.join(parts)
+
+def check_lemma_axiom_in_lemmas(file_path, content):
     """
     Check that all 'val lemma' and 'axiom' declarations only appear in modules ending with 'Lemmas'.
     """
-    with open(file_path, 'r') as f:
-        content = f.read()
-
-    # Remove comments from the content
-    content = remove_comments(content)
-
-    # Find all module declarations
-    module_pattern = re.compile(r'module\s+(\w+)\s*')
-    modules = module_pattern.findall(content)
-
-    # Find all 'val lemma' and 'axiom' declarations
-    lemma_pattern = re.compile(r'\b(val lemma|axiom)\b')
-    declarations = lemma_pattern.findall(content)
-
     # Current module tracking
     current_module = None
+    reported_line = None  # Start of the last line with an error, so each line is reported once
     errors = []
 
-    for line in content.splitlines():
-        module_match = re.match(module_pattern, line)
-        if module_match:
-            current_module = module_match.group(1)
-
-        if 'val lemma' in line or 'axiom' in line:
-            if current_module and not current_module.endswith('Lemmas') and not current_module.endswith('Spec'):
-                errors.append(f"Error in {file_path}: 'val lemma' or 'axiom' found in non-Lemmas module '{current_module}")
+    # Module and lemma/axiom declarations are found in one scan, in order of appearance
+    for match in DECLARATION_PATTERN.finditer(content):
+        if match.group(1):
+            current_module = match.group(1)
+        elif current_module and not current_module.endswith(('Lemmas', 'Spec')):
+            line = content.rfind('\n', 0, match.start())
+            if line == reported_line:
+                continue
+            reported_line = line
+            errors.append(f"Error in {file_path}: 'val lemma' or 'axiom' found in non-Lemmas module '{current_module}")
 
     return errors
 
-def check_proofs_for_lemmas(file_path):
+def check_proofs_for_lemmas(file_path, content):
     """
     Check that each XLemmas module has a corresponding XProofs module declared as 'module XProofs : XLemmas'.
     """
-    with open(file_path, 'r') as f:
-        content = f.read()
-
     # Find all Lemmas modules
-    lemmas_pattern = re.compile(r'module\s+(\w+Lemmas)\b')
-    lemmas_modules = lemmas_pattern.findall(content)
+    lemmas_modules = LEMMAS_PATTERN.findall(content)
 
     # Find all Proofs modules that reference Lemmas modules
-    proofs_pattern = re.compile(r'module\s+(\w+Proofs)\s*:\s*(\w+Lemmas)')
-    proofs_modules = proofs_pattern.findall(content)
+    proofs_modules = PROOFS_PATTERN.findall(content)
 
     # Create a dictionary to map Lemmas to their Proofs modules
     proofs_dict = {proof: lemma for proof, lemma in proofs_modules}
@@ -70,15 +79,28 @@ def check_proofs_for_lemmas(file_path):
 
     return errors
 
+def check_whyml_file(file_path):
+    """
+    Check the conditions on a single WhyML file.
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        # Remove comments from the content, both checks work on the result
+        content = remove_comments(f.read())
+
+    return check_lemma_axiom_in_lemmas(file_path, content) + check_proofs_for_lemmas(file_path, content)
+
 def check_whyml_files():
     """
     Go through all WhyML files in the current directory and check the conditions.
     """
+    with os.scandir('.') as entries:
+        file_names = [entry.name for entry in entries if entry.name.endswith('.mlw')]
+
+    # Files are independent, so reading them overlaps with checking the others
     errors = []
-    for file_name in os.listdir('.'):
-        if file_name.endswith('.mlw'):
-            errors.extend(check_lemma_axiom_in_lemmas(file_name))
-            errors.extend(check_proofs_for_lemmas(file_name))
+    with ThreadPoolExecutor() as executor:
+        for file_errors in executor.map(check_whyml_file, file_names):
+            errors.extend(file_errors)
 
     if errors:
         print("Statement-proof-separation check FAILED:")